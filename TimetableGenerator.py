@@ -1,21 +1,59 @@
 import pandas as pd
 import numpy as np
 import string
-from datetime import datetime, timedelta
+import argparse
+
+# -------------------------------
+# Time helpers (times are integer seconds since midnight)
+# -------------------------------
+
+def parse_hms(text):
+    """
+    Convert a 'HH:MM:SS' string to seconds since midnight.
+    """
+    hours, minutes, seconds = (int(part) for part in text.split(':'))
+    return hours * 3600 + minutes * 60 + seconds
+
+def fmt_hms(seconds):
+    """
+    Format an array of seconds since midnight as 'HH:MM:SS' strings (vectorized).
+    Times past midnight wrap around; negative values (missing times) become ''.
+    """
+    seconds = np.asarray(seconds, dtype=np.int64)
+    if seconds.size == 0:
+        return np.empty(seconds.shape, dtype=str)
+    hours, rem = np.divmod(seconds % 86400, 3600)
+    minutes, secs = np.divmod(rem, 60)
+    hms = np.char.add(np.char.add(np.char.zfill(hours.astype(str), 2), ':'),
+                      np.char.add(np.char.zfill(minutes.astype(str), 2), ':'))
+    hms = np.char.add(hms, np.char.zfill(secs.astype(str), 2))
+    return np.where(seconds < 0, '', hms)
 
 # -------------------------------
 # PART 1: Generate Random Stations
 # -------------------------------
 
-def generate_station_code(existing):
+def generate_unique_codes(n, alphabet, length, prefixes=('',)):
     """
-    Generate a unique 3-letter station code.
+    Generate n distinct random codes, each made of a random prefix followed by
+    `length` random characters from `alphabet`.
+    
+    Candidates are drawn in large batches with a single RNG call and deduplicated
+    with np.unique, keeping them in the order they were drawn.
     """
-    while True:
-        code = ''.join(np.random.choice(list(string.ascii_uppercase), 3))
-        if code not in existing:
-            existing.add(code)
-            return code
+    max_codes = len(prefixes) * len(alphabet) ** length
+    if n > max_codes:
+        raise ValueError(f"Cannot generate {n} unique codes: only {max_codes} are possible.")
+    letters = np.frombuffer(alphabet.encode(), dtype=np.uint8)
+    codes = np.empty(0, dtype=str)
+    while len(codes) < n:
+        draws = letters[np.random.randint(0, len(letters), size=(4 * n, length))]
+        candidates = np.char.add(np.random.choice(prefixes, 4 * n),
+                                 draws.view(f'S{length}').ravel().astype(str))
+        candidates = np.concatenate([codes, candidates])
+        _, first_seen = np.unique(candidates, return_index=True)
+        codes = candidates[np.sort(first_seen)]
+    return codes[:n].tolist()
 
 def generate_random_stations(num_stations=10, lat_range=(10, 50), lon_range=(10, 50)):
     """
@@ -26,14 +64,11 @@ def generate_random_stations(num_stations=10, lat_range=(10, 50), lon_range=(10,
       
     The latitude and longitude are uniformly distributed within the specified ranges.
     """
-    station_set = set()
-    stations = []
     lats = np.random.uniform(lat_range[0], lat_range[1], num_stations)
     lons = np.random.uniform(lon_range[0], lon_range[1], num_stations)
     
-    for i in range(num_stations):
-        code = generate_station_code(station_set)
-        stations.append(code)
+    # Unique 3-letter station codes.
+    stations = generate_unique_codes(num_stations, string.ascii_uppercase, 3)
 
     stations_id = np.random.choice(len(stations), len(stations), replace=False)
     
@@ -50,17 +85,6 @@ def generate_random_stations(num_stations=10, lat_range=(10, 50), lon_range=(10,
 # PART 2: Generate Random Train Information
 # -------------------------------
 
-def generate_train_code(existing):
-    """
-    Generate a unique train code that starts with 'R' or 'E' followed by two random digits.
-    """
-    prefix = np.random.choice(['R', 'E'])
-    while True:
-        code = prefix + ''.join(np.random.choice(list(string.digits), 2))
-        if code not in existing:
-            existing.add(code)
-            return code
-
 def generate_random_trains(num_trains=5, departure_window=('05:00:00', '12:00:00')):
     """
     Generate random train information.
@@ -70,23 +94,21 @@ def generate_random_trains(num_trains=5, departure_window=('05:00:00', '12:00:00
     Returns:
       A list of lists: [train_code, first_departure (as HH:MM:SS), last_arrival (as HH:MM:SS)].
     """
-    train_set = set()
-    trains = []
-    dep_start = datetime.strptime(departure_window[0], '%H:%M:%S')
-    dep_end   = datetime.strptime(departure_window[1], '%H:%M:%S')
-    dep_range_minutes = int((dep_end - dep_start).total_seconds() / 60)
-
-    for _ in range(num_trains):
-        train_code = generate_train_code(train_set)
-        # Generate a random first departure within the departure window.
-        first_dep_minutes = np.random.randint(0, dep_range_minutes)
-        first_dep_time = dep_start + timedelta(minutes=first_dep_minutes)
-        # Generate a random travel duration between 1 and 2 hours.
-        travel_duration = np.random.randint(60, 120)  # minutes
-        last_arrival_time = first_dep_time + timedelta(minutes=travel_duration)
-        trains.append([train_code,
-                       first_dep_time.strftime('%H:%M:%S'),
-                       last_arrival_time.strftime('%H:%M:%S')])
+    # Unique train codes: 'R' or 'E' followed by two random digits.
+    train_codes = generate_unique_codes(num_trains, string.digits, 2, prefixes=('R', 'E'))
+    dep_start = parse_hms(departure_window[0])
+    dep_end = parse_hms(departure_window[1])
+    dep_range_minutes = (dep_end - dep_start) // 60
+    
+    # Generate a random first departure within the departure window.
+    first_dep = dep_start + 60 * np.random.randint(0, dep_range_minutes, num_trains)
+    # Generate a random travel duration between 1 and 2 hours.
+    travel_duration = np.random.randint(60, 120, num_trains)  # minutes
+    last_arrival = first_dep + 60 * travel_duration
+    
+    trains = [[train_code, dep, arr]
+              for train_code, dep, arr in zip(train_codes, fmt_hms(first_dep).tolist(),
+                                              fmt_hms(last_arrival).tolist())]
     return trains
 
 # -------------------------------
@@ -109,58 +131,89 @@ def generate_random_timetable(stations, trains_info, stop_probability=0.7, stop_
       A DataFrame with columns:
       ['Train number', 'Station', 'Arrival time', 'Departure time', 'Stop type'].
     """
-    timetable = []
-    for train, first_dep, last_arr in trains_info:
-        dep_time = datetime.strptime(first_dep, '%H:%M:%S')
-        arr_time = datetime.strptime(last_arr, '%H:%M:%S')
-        total_seconds = int((arr_time - dep_time).total_seconds())
+    # Per-train column chunks; the DataFrame is assembled column-wise once at the end.
+    train_cols, station_cols, arrival_cols, departure_cols, type_cols = [], [], [], [], []
+    
+    # Route sizes (at least 2 stations) and one uniform key per (train, station), drawn at once.
+    station_codes = np.asarray(stations, dtype=object)
+    num_train_stations = np.random.randint(2, len(stations) + 1, len(trains_info))
+    route_keys = np.random.random((len(trains_info), len(stations)))
+    
+    for (train, first_dep, last_arr), n_stops, keys in zip(trains_info, num_train_stations, route_keys):
+        start_seconds = parse_hms(first_dep)
+        total_seconds = parse_hms(last_arr) - start_seconds
         
-        # Randomly select a subset of stations (at least 2) for this train's route.
-        num_train_stations = np.random.randint(2, len(stations) + 1)
-        train_route = np.random.choice(stations, num_train_stations, replace=False).tolist()
-        np.random.shuffle(train_route)  # Randomize the order of selected stations.
+        # Randomly select a subset of stations for this train's route: the n_stops stations
+        # with the smallest keys. Ordering them by key randomizes the order of the route.
+        route_idx = np.argpartition(keys, n_stops - 1)[:n_stops]
+        train_route = station_codes[route_idx[np.argsort(keys[route_idx])]]
         
-        n_stops = len(train_route)
-        # Generate uniformly distributed times (in seconds) for intermediate stops.
-        if n_stops > 2:
-            random_offsets = sorted(np.random.uniform(0, total_seconds, n_stops - 2))
-            station_offsets = [0] + random_offsets + [total_seconds]
-        else:
-            station_offsets = [0, total_seconds]
+        # Generate uniformly distributed times (in seconds) for intermediate stops, already
+        # sorted: normalized cumulative sums of exponential spacings are uniform order statistics.
+        spacings = np.random.exponential(size=n_stops - 1)
+        random_offsets = (np.cumsum(spacings[:-1]) / spacings.sum() * total_seconds).astype(np.int64)
         
-        # Add first station (begin)
-        timetable.append([train, train_route[0], '', dep_time.strftime('%H:%M:%S'), 'begin'])
+        # Determine for each intermediate station if the train stops or just passes through.
+        is_stop = np.random.rand(n_stops - 2) < stop_probability
+        stop_minutes = np.where(
+            is_stop,
+            np.random.randint(stop_duration_range[0], stop_duration_range[1] + 1, n_stops - 2),
+            0)
         
-        # Add intermediate stations
-        for i in range(1, n_stops - 1):
-            arrival_time = dep_time + timedelta(seconds=int(station_offsets[i]))
-            # Determine if the train stops or just passes through.
-            if np.random.rand() < stop_probability:
-                stop_type = 'stop'
-                stop_minutes = np.random.randint(stop_duration_range[0], stop_duration_range[1] + 1)
-            else:
-                stop_type = 'pass'
-                stop_minutes = 0
-            departure_time = arrival_time + timedelta(minutes=stop_minutes)
-            timetable.append([
-                train,
-                train_route[i],
-                arrival_time.strftime('%H:%M:%S'),
-                departure_time.strftime('%H:%M:%S') if stop_minutes else arrival_time.strftime('%H:%M:%S'),
-                stop_type
-            ])
+        # First station (begin) has no arrival, last station (end) has no departure (-1).
+        arrival_s = start_seconds + np.concatenate([[0], random_offsets, [total_seconds]])
+        departure_s = start_seconds + np.concatenate([[0], random_offsets + stop_minutes * 60, [total_seconds]])
+        arrival_s[0] = -1
+        departure_s[-1] = -1
         
-        # Add last station (end)
-        timetable.append([train, train_route[-1], arr_time.strftime('%H:%M:%S'), '', 'end'])
+        train_cols.append(np.full(n_stops, train, dtype=object))
+        station_cols.append(train_route)
+        arrival_cols.append(arrival_s)
+        departure_cols.append(departure_s)
+        type_cols.append(np.concatenate([['begin'], np.where(is_stop, 'stop', 'pass'), ['end']]).astype(object))
     
-    timetable_df = pd.DataFrame(timetable, columns=['Train number', 'Station', 'Arrival time', 'Departure time', 'Stop type'])
+    if not trains_info:
+        return pd.DataFrame(columns=['Train number', 'Station', 'Arrival time', 'Departure time', 'Stop type'])
+    
+    timetable_df = pd.DataFrame({
+        'Train number': np.concatenate(train_cols),
+        'Station': np.concatenate(station_cols),
+        'Arrival time': fmt_hms(np.concatenate(arrival_cols)),
+        'Departure time': fmt_hms(np.concatenate(departure_cols)),
+        'Stop type': np.concatenate(type_cols),
+    })
     return timetable_df
 
+# -------------------------------
+# PART 4: Write Output Files
+# -------------------------------
+
+def write_table(df, path, fmt='csv'):
+    """
+    Write a generated table in the requested format:
+      - 'csv': semicolon-separated CSV without index (default).
+      - 'feather' / 'parquet': binary columnar formats, faster to write and to load
+        back into pandas (require pyarrow).
+    """
+    if fmt == 'csv':
+        df.to_csv(path, index=False, sep=';')
+    elif fmt == 'feather':
+        df.to_feather(path)
+    elif fmt == 'parquet':
+        df.to_parquet(path, index=False)
+    else:
+        raise ValueError("Invalid format. Use 'csv', 'feather' or 'parquet'.")
+
 # -------------------------------
 # MAIN EXECUTION
 # -------------------------------
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate random stations, trains and timetable.")
+    parser.add_argument('--fmt', choices=('csv', 'feather', 'parquet'), default='csv',
+                        help="output file format (default: csv)")
+    args = parser.parse_args()
+    
     # Parameters (adjust as needed)
     num_stations = 10
     num_trains   = 5
@@ -170,9 +223,9 @@ if __name__ == "__main__":
     
     # Generate random stations with coordinates.
     stations, stations_df = generate_random_stations(num_stations=num_stations, lat_range=lat_range, lon_range=lon_range)
-    stations_csv_path = "RandomStationCoordinates.csv"
-    stations_df.to_csv(stations_csv_path, index=False, sep=';')
-    print(f"Generated station coordinates saved to '{stations_csv_path}'")
+    stations_path = f"RandomStationCoordinates.{args.fmt}"
+    write_table(stations_df, stations_path, args.fmt)
+    print(f"Generated station coordinates saved to '{stations_path}'")
     print(stations_df.head())
     
     # Generate random train information.
@@ -183,8 +236,8 @@ if __name__ == "__main__":
     
     # Generate random timetable based on the generated stations and train info.
     timetable_df = generate_random_timetable(stations, trains_info, stop_probability=0.7, stop_duration_range=(1,3))
-    timetable_csv_path = "RandomTimetable.csv"
-    timetable_df.to_csv(timetable_csv_path, index=False, sep=';')
-    print(f"\nGenerated timetable saved to '{timetable_csv_path}'")
+    timetable_path = f"RandomTimetable.{args.fmt}"
+    write_table(timetable_df, timetable_path, args.fmt)
+    print(f"\nGenerated timetable saved to '{timetable_path}'")
     print("\nTimetable Preview:")
     print(timetable_df.head(20))
@@ -1,7 +1,258 @@
 import pandas as pd
-from datetime import datetime, timedelta
 import numpy as np
 
+try:
+    from numba import njit
+except ImportError:
+    # Numba is optional: without it the edge accumulation falls back to NumPy.
+    njit = None
+
+# Network spaces: allowed stop types (lowercase) and whether the stops of a train
+# form a clique (True) or are linked consecutively (False).
+SPACE_TYPES = {
+    "stations": (frozenset({"begin", "pass", "stop", "end", "service_stop"}), False),
+    "stops": (frozenset({"begin", "stop", "end"}), False),
+    "changes": (frozenset({"begin", "stop", "end"}), True),
+}
+
+# =============================================================================
+# FUNCTION: parse_hms_seconds
+# =============================================================================
+def parse_hms_seconds(times):
+    """
+    Convert a column of "HH:MM:SS" strings to seconds since midnight in one
+    vectorized pass.
+    
+    Missing or malformed values are returned as -1 so that callers can skip them
+    without constructing any datetime objects.
+    
+    Parameters:
+      times: Series of time strings (may contain NaN or empty strings).
+    
+    Returns:
+      numpy int64 array of seconds since midnight (-1 where the time is invalid).
+    """
+    parsed = pd.to_datetime(times, format="%H:%M:%S", errors="coerce", cache=True)
+    seconds = parsed.dt.hour * 3600 + parsed.dt.minute * 60 + parsed.dt.second
+    return seconds.fillna(-1).to_numpy(dtype=np.int64)
+
+# =============================================================================
+# FUNCTION: _accumulate_edges
+# =============================================================================
+def _accumulate_edges_py(train_ptr, sids, dep_s, arr_s, clique, n_stations, edge_keys,
+                         dsn, dt_sum, dt_count):
+    """
+    Accumulate DSN/DTN statistics for the ordered stops of every train.
+    
+    NumPy implementation, used when Numba is not available.
+    
+    Parameters:
+      train_ptr: int64 array; the stops of train t are rows train_ptr[t]:train_ptr[t + 1].
+      sids, dep_s, arr_s: int64 arrays of station ids and departure/arrival seconds
+                          (-1 where the time is invalid), each train in its own order.
+      clique: if True link every pair (i, j) with i < j, otherwise only (i, i + 1).
+      n_stations: number of station ids; edge keys are source_id * n_stations + target_id.
+      edge_keys: int64 array, filled with the key of each edge id (ids in order of first sight).
+      dsn, dt_sum, dt_count: zeroed edge accumulators, large enough for every edge.
+    
+    Returns:
+      the number of edges.
+    """
+    # Row pairs (i, j) of all trains, train by train.
+    pairs = []
+    for t in range(len(train_ptr) - 1):
+        start, n = train_ptr[t], train_ptr[t + 1] - train_ptr[t]
+        if clique:
+            ii, jj = np.triu_indices(n, 1)
+        else:
+            ii = np.arange(max(n - 1, 0))
+            jj = ii + 1
+        pairs.append((ii + start, jj + start))
+    ii = np.concatenate([p[0] for p in pairs] or [np.empty(0, dtype=np.int64)])
+    jj = np.concatenate([p[1] for p in pairs] or [np.empty(0, dtype=np.int64)])
+    
+    edge_id = {}  # key: source_id * n_stations + target_id → edge id
+    edge_k = np.empty(len(ii), dtype=np.int64)
+    for p, key in enumerate((sids[ii] * n_stations + sids[jj]).tolist()):
+        k = edge_id.get(key)
+        if k is None:
+            k = len(edge_id)
+            edge_id[key] = k
+            edge_keys[k] = key
+        edge_k[p] = k
+    np.add.at(dsn, edge_k, 1)
+    travel_time = arr_s[jj] - dep_s[ii]
+    valid = (dep_s[ii] >= 0) & (arr_s[jj] >= 0) & (travel_time >= 0)
+    np.add.at(dt_sum, edge_k[valid], travel_time[valid])
+    np.add.at(dt_count, edge_k[valid], 1)
+    return len(edge_id)
+
+def _accumulate_edges_nb(train_ptr, sids, dep_s, arr_s, clique, n_stations, edge_keys,
+                         dsn, dt_sum, dt_count):
+    # Same contract as _accumulate_edges_py, written as plain loops for Numba. Edge ids
+    # are looked up in an open-addressed hash table (linear probing) held in two int64
+    # arrays, with a power-of-two capacity at least twice the maximum number of edges.
+    # Empty slots hold -1, so every real key must be non-negative.
+    capacity = 1
+    while capacity < 2 * len(edge_keys):
+        capacity *= 2
+    mask = capacity - 1
+    table_keys = np.full(capacity, -1, dtype=np.int64)
+    table_vals = np.empty(capacity, dtype=np.int64)
+    
+    n_edges = 0
+    for t in range(len(train_ptr) - 1):
+        end = train_ptr[t + 1]
+        for i in range(train_ptr[t], end - 1):
+            last = end if clique else i + 2
+            for j in range(i + 1, last):
+                key = sids[i] * n_stations + sids[j]
+                if key < 0:
+                    raise ValueError("Station ids must be non-negative.")
+                slot = (key * 2654435761) & mask
+                while table_keys[slot] != key and table_keys[slot] != -1:
+                    slot = (slot + 1) & mask
+                if table_keys[slot] == key:
+                    k = table_vals[slot]
+                else:
+                    k = n_edges
+                    table_keys[slot] = key
+                    table_vals[slot] = k
+                    edge_keys[k] = key
+                    n_edges += 1
+                dsn[k] += 1
+                travel_time = arr_s[j] - dep_s[i]
+                if dep_s[i] >= 0 and arr_s[j] >= 0 and travel_time >= 0:
+                    dt_sum[k] += travel_time
+                    dt_count[k] += 1
+    return n_edges
+
+if njit is not None:
+    _accumulate_edges = njit(cache=True)(_accumulate_edges_nb)
+else:
+    _accumulate_edges = _accumulate_edges_py
+
+# =============================================================================
+# FUNCTION: _preprocess
+# =============================================================================
+def _preprocess(timetable_df):
+    """
+    Run the timetable preparation shared by all network spaces, once.
+    
+    Station names, stop types and times are normalized and turned into integer
+    arrays aligned with the rows of timetable_df, and the rows of each train are
+    located with a single groupby. A row with a missing station name raises ValueError.
+    
+    Returns:
+      dict with
+         - "sid": station id of each row (ids follow the sorted, trimmed station names).
+         - "nid": id of each row's trimmed, uppercased station name (used to deduplicate stops).
+         - "dep_s", "arr_s": departure/arrival seconds since midnight (-1 where invalid).
+         - "stype_id": category code of each row's lowercased stop type (-1 if missing).
+         - "stop_types": the stop type categories, indexed by category code.
+         - "trains": dict mapping train number → row positions of that train, ordered by index label.
+         - "stations": list of station codes, indexed by station id.
+    """
+    # Normalize every station name once and intern it as a small integer id.
+    stripped = timetable_df["Station"].str.strip()
+    sid_codes, station_names = pd.factorize(stripped, sort=True)
+    if (sid_codes < 0).any():
+        raise ValueError("Missing station name in timetable.")
+    nid_codes, _ = pd.factorize(stripped.str.upper())
+    
+    # Lowercase the stop types once and store them as a categorical: rows are then
+    # filtered by comparing the integer category codes.
+    stop_types = timetable_df["Stop type"].str.lower().astype("category")
+    
+    # Rows of each train, ordered by index label (as group.sort_index() would).
+    trains = timetable_df.groupby("Train number", sort=False).indices
+    if not timetable_df.index.is_monotonic_increasing:
+        rank = np.empty(len(timetable_df), dtype=np.int64)
+        rank[np.argsort(timetable_df.index.to_numpy(), kind="stable")] = np.arange(len(timetable_df))
+        trains = {train: idx[np.argsort(rank[idx])] for train, idx in trains.items()}
+    
+    return {
+        "sid": sid_codes.astype(np.int64),
+        "nid": nid_codes.astype(np.int64),
+        "dep_s": parse_hms_seconds(timetable_df["Departure time"]),
+        "arr_s": parse_hms_seconds(timetable_df["Arrival time"]),
+        "stype_id": stop_types.cat.codes.to_numpy(dtype=np.int64),
+        "stop_types": stop_types.cat.categories,
+        "trains": trains,
+        "stations": station_names.tolist(),
+    }
+
+# =============================================================================
+# FUNCTION: build_edges_for_space
+# =============================================================================
+def build_edges_for_space(prep, space_type):
+    """
+    Build the directed weighted network of one space from preprocessed timetable data.
+    
+    Parameters:
+      prep: the result of _preprocess(timetable_df).
+      space_type: "stations", "stops" or "changes" (see build_directed_network_with_time).
+    
+    Returns:
+      vertices, edge_data as described in build_directed_network_with_time.
+    """
+    if space_type not in SPACE_TYPES:
+        raise ValueError("Unknown space type.")
+    allowed_lower, clique_mode = SPACE_TYPES[space_type]
+    
+    categories = prep["stop_types"]
+    allowed_ids = np.array([categories.get_loc(stype) for stype in allowed_lower if stype in categories],
+                           dtype=np.int64)
+    allowed_row = np.isin(prep["stype_id"], allowed_ids)
+    nid_col = prep["nid"]
+    
+    # Lay out the kept rows of every train contiguously: train t owns rows train_ptr[t]:train_ptr[t + 1].
+    train_rows = []
+    for idx in prep["trains"].values():
+        idx = idx[allowed_row[idx]]
+        if clique_mode:
+            # For "changes" mode: deduplicate stops in the train using normalized station names,
+            # keeping the first occurrence of each station in the train's order.
+            _, first_seen = np.unique(nid_col[idx], return_index=True)
+            idx = idx[np.sort(first_seen)]
+        train_rows.append(idx)
+    lengths = np.array([len(idx) for idx in train_rows], dtype=np.int64)
+    train_ptr = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+    rows = np.concatenate(train_rows).astype(np.int64) if train_rows else np.empty(0, dtype=np.int64)
+    sids, dep_s, arr_s = prep["sid"][rows], prep["dep_s"][rows], prep["arr_s"][rows]
+    
+    # Edge accumulators are parallel arrays indexed by edge id, sized for the most
+    # edges the trains could produce.
+    station_names = prep["stations"]
+    n_stations = len(station_names)
+    if clique_mode:
+        max_edges = int((lengths * (lengths - 1) // 2).sum())
+    else:
+        max_edges = int(np.maximum(lengths - 1, 0).sum())
+    max_edges = min(max_edges, n_stations * n_stations)
+    dsn = np.zeros(max_edges, dtype=np.int64)
+    dt_sum = np.zeros(max_edges, dtype=np.float64)
+    dt_count = np.zeros(max_edges, dtype=np.int64)
+    edge_keys = np.empty(max_edges, dtype=np.int64)  # source_id * n_stations + target_id
+    
+    if (sids < 0).any():
+        raise ValueError("Station ids must be non-negative.")
+    
+    # Consecutive modes link (i, i + 1); "changes" links every (i, j) with i < j in the
+    # train's order. Only the natural direction src -> tgt is added.
+    n_edges = _accumulate_edges(train_ptr, sids, dep_s, arr_s, clique_mode, n_stations,
+                                edge_keys, dsn, dt_sum, dt_count)
+    
+    vertices = {station_names[sid] for sid in np.unique(sids).tolist()}
+    edge_data = {
+        "stations": station_names,
+        "edge_keys": edge_keys[:n_edges],
+        "dsn": dsn[:n_edges],
+        "dt_sum": dt_sum[:n_edges],
+        "dt_count": dt_count[:n_edges],
+    }
+    return vertices, edge_data
+
 # =============================================================================
 # FUNCTION: build_directed_network_with_time
 # =============================================================================
@@ -14,6 +265,9 @@ def build_directed_network_with_time(timetable_df, space_type):
       - DTN: aggregates travel times (in seconds) and counts valid observations so that 
              the mean travel time (in minutes) can be computed and then its reciprocal taken.
     
+    To build several spaces from the same timetable, call _preprocess once and
+    build_edges_for_space for each space instead.
+    
     Parameters:
       timetable_df: DataFrame with columns "Train number", "Station", "Arrival time",
                     "Departure time", and "Stop type".
@@ -30,99 +284,72 @@ def build_directed_network_with_time(timetable_df, space_type):
     
     Returns:
       vertices: set of station codes.
-      edge_data: dict mapping (source, target) → {"dsn": int, "dt_sum": float, "dt_count": int}
-    """
-    if space_type == "stations":
-        allowed = {"begin", "pass", "stop", "end", "service_stop"}
-        consecutive_mode = True
-        clique_mode = False
-    elif space_type == "stops":
-        allowed = {"begin", "stop", "end"}
-        consecutive_mode = True
-        clique_mode = False
-    elif space_type == "changes":
-        allowed = {"begin", "stop", "end"}
-        consecutive_mode = False
-        clique_mode = True
-    else:
+      edge_data: dict with
+         - "stations": list of station codes, indexed by station id.
+         - "edge_keys": numpy array of source_id * len(stations) + target_id, indexed by edge id.
+         - "dsn", "dt_sum", "dt_count": numpy arrays indexed by edge id.
+    """
+    if space_type not in SPACE_TYPES:
         raise ValueError("Unknown space type.")
+    return build_edges_for_space(_preprocess(timetable_df), space_type)
+
+# =============================================================================
+# FUNCTION: _pajek_layout / _dsn_weights / _dtn_weights / _format_arcs
+# =============================================================================
+def _pajek_layout(vertices, edge_data):
+    """
+    Prepare the parts of a Pajek file shared by the DSN and DTN outputs.
     
-    vertices = set()
-    edge_data = {}  # key: (source, target)
-    
-    groups = timetable_df.groupby("Train number", sort=False)
-    allowed_lower = {s.lower() for s in allowed}
-    
-    for train, group in groups:
-        group_ordered = group.sort_index()
-        filtered = group_ordered[group_ordered["Stop type"].str.lower().isin(allowed_lower)]
-        rows = filtered.to_dict('records')
-        
-        if not clique_mode:
-            # For consecutive modes ("stations" and "stops"), use all rows in order.
-            station_list = [row["Station"].strip() for row in rows]
-            for st in station_list:
-                vertices.add(st)
-            pairs = [(i, i + 1) for i in range(len(rows) - 1)]
-            for i, j in pairs:
-                src = rows[i]["Station"].strip()
-                tgt = rows[j]["Station"].strip()
-                edge = (src, tgt)
-                if edge not in edge_data:
-                    edge_data[edge] = {"dsn": 0, "dt_sum": 0.0, "dt_count": 0}
-                edge_data[edge]["dsn"] += 1
-                dep_time_str = rows[i].get("Departure time", "")
-                arr_time_str = rows[j].get("Arrival time", "")
-                if pd.notna(dep_time_str) and dep_time_str != "" and pd.notna(arr_time_str) and arr_time_str != "":
-                    try:
-                        dep_time = datetime.strptime(dep_time_str, "%H:%M:%S")
-                        arr_time = datetime.strptime(arr_time_str, "%H:%M:%S")
-                        travel_time = (arr_time - dep_time).total_seconds()
-                        if travel_time >= 0:
-                            edge_data[edge]["dt_sum"] += travel_time
-                            edge_data[edge]["dt_count"] += 1
-                    except Exception:
-                        pass
-        else:
-            # For "changes" mode: deduplicate stops in the train using normalized station names.
-            unique_rows = []
-            seen = set()
-            for row in rows:
-                norm = row["Station"].strip().upper()
-                if norm not in seen:
-                    unique_rows.append(row)
-                    seen.add(norm)
-            for row in unique_rows:
-                vertices.add(row["Station"].strip())
-            n = len(unique_rows)
-            for i in range(n):
-                for j in range(i + 1, n):
-                    src = unique_rows[i]["Station"].strip()
-                    tgt = unique_rows[j]["Station"].strip()
-                    # Compute travel time using the natural order (if available)
-                    dep_time_str = unique_rows[i].get("Departure time", "")
-                    arr_time_str = unique_rows[j].get("Arrival time", "")
-                    travel_time = None
-                    if pd.notna(dep_time_str) and dep_time_str != "" and pd.notna(arr_time_str) and arr_time_str != "":
-                        try:
-                            dep_time = datetime.strptime(dep_time_str, "%H:%M:%S")
-                            arr_time = datetime.strptime(arr_time_str, "%H:%M:%S")
-                            diff = (arr_time - dep_time).total_seconds()
-                            if diff >= 0:
-                                travel_time = diff
-                        except Exception:
-                            travel_time = None
-                    # Only add the edge in the natural order: src -> tgt.
-                    edge = (src, tgt)
-                    if edge not in edge_data:
-                        edge_data[edge] = {"dsn": 0, "dt_sum": 0.0, "dt_count": 0}
-                    edge_data[edge]["dsn"] += 1
-                    if travel_time is not None:
-                        edge_data[edge]["dt_sum"] += travel_time
-                        edge_data[edge]["dt_count"] += 1
-                    # Note: We do not add a reverse edge here, so direction is preserved.
+    Returns:
+      header: the "*Vertices" section followed by the "*Arcs <total_edges>" line.
+      src_vids, tgt_vids: int64 arrays with the vertex ids of each arc, in edge id order.
+    """
+    vertex_list = sorted(list(vertices))
+    vertex_map = {station: i + 1 for i, station in enumerate(vertex_list)}
+    stations = edge_data["stations"]
     
-    return vertices, edge_data
+    # Resolve every arc's source and target vertex ids in one vectorized pass
+    # (edge keys are source_id * len(stations) + target_id, in edge id order).
+    vid_of_station = np.array([vertex_map.get(station, 0) for station in stations], dtype=np.int64)
+    keys = edge_data["edge_keys"]
+    src_vids = vid_of_station[keys // len(stations)]
+    tgt_vids = vid_of_station[keys % len(stations)]
+    
+    lines = [f"*Vertices {len(vertex_list)}"]
+    lines.extend(f'{i + 1} "{station}"' for i, station in enumerate(vertex_list))
+    lines.append(f"*Arcs {len(keys)}")
+    return "\n".join(lines) + "\n", src_vids, tgt_vids
+
+def _dsn_weights(edge_data):
+    """
+    Number of trains running every edge.
+    """
+    return edge_data["dsn"]
+
+def _dtn_weights(edge_data):
+    """
+    Reciprocal of the mean travel time in minutes for every edge (0 where it is unknown or not positive).
+    """
+    dt_sum = edge_data["dt_sum"]
+    dt_count = edge_data["dt_count"]
+    mean_dt_minutes = dt_sum / np.maximum(dt_count, 1) / 60.0
+    weights = np.zeros(len(dt_sum), dtype=np.float64)
+    np.divide(1.0, mean_dt_minutes, out=weights, where=(dt_count > 0) & (mean_dt_minutes > 0))
+    return weights
+
+def _format_arcs(src_vids, tgt_vids, weights, spec):
+    """
+    Format the arcs section: one "vertexID_source vertexID_target weight" line per edge,
+    with each weight formatted by the format spec (e.g. "" for DSN counts, ".2f" for DTN).
+    """
+    return "".join([f"{src} {tgt} {weight:{spec}}\n"
+                    for src, tgt, weight in zip(src_vids, tgt_vids, weights)])
+
+# Weights and their format spec for each Pajek output mode.
+ARC_WEIGHTS = {
+    "dsn": (_dsn_weights, ""),
+    "dtn": (_dtn_weights, ".2f"),
+}
 
 # =============================================================================
 # FUNCTION: write_pajek_arcs_with_mode
@@ -138,38 +365,55 @@ def write_pajek_arcs_with_mode(vertices, edge_data, filename, mode):
       - If mode is "dtn": weight = reciprocal of the mean travel time (in minutes)
                      (if the mean travel time is T > 0 then weight = 1/T, else 0).
     
+    To write both files of a network, write_pajek_arcs_both shares the preparation.
+    
     Parameters:
       vertices: set of station codes.
-      edge_data: dict mapping (source, target) → {"dsn", "dt_sum", "dt_count"}.
+      edge_data: edge arrays as returned by build_directed_network_with_time.
       filename: output file name.
       mode: either "dsn" or "dtn".
     """
-    vertex_list = sorted(list(vertices))
-    vertex_map = {station: i + 1 for i, station in enumerate(vertex_list)}
-    total_edges = len(edge_data)
-    
-    with open(filename, "w") as f:
-        f.write(f"*Vertices {len(vertex_list)}\n")
-        for station, vid in vertex_map.items():
-            f.write(f'{vid} "{station}"\n')
-        f.write(f"*Arcs {total_edges}\n")
-        for (src, tgt), data in edge_data.items():
-            if mode == "dsn":
-                weight = data["dsn"]
-                f.write(f"{vertex_map[src]} {vertex_map[tgt]} {weight}\n")
-            elif mode == "dtn":
-                if data["dt_count"] > 0:
-                    mean_dt_minutes = (data["dt_sum"] / data["dt_count"]) / 60.0
-                else:
-                    mean_dt_minutes = 0.0
-                if mean_dt_minutes > 0:
-                    weight = 1.0 / mean_dt_minutes
-                    #weight = mean_dt_minutes
-                else:
-                    weight = 0.0
-                f.write(f"{vertex_map[src]} {vertex_map[tgt]} {weight:.2f}\n")
-            else:
-                raise ValueError("Invalid mode. Use 'dsn' or 'dtn'.")
+    if mode not in ARC_WEIGHTS:
+        raise ValueError("Invalid mode. Use 'dsn' or 'dtn'.")
+    
+    header, src_vids, tgt_vids = _pajek_layout(vertices, edge_data)
+    weights, spec = ARC_WEIGHTS[mode]
+    arcs = _format_arcs(src_vids.tolist(), tgt_vids.tolist(), weights(edge_data).tolist(), spec)
+    
+    # Write through a large buffer: header and arcs each as one string.
+    with open(filename, "w", buffering=1 << 20) as f:
+        f.write(header)
+        f.write(arcs)
+
+# =============================================================================
+# FUNCTION: write_pajek_arcs_both
+# =============================================================================
+def write_pajek_arcs_both(vertices, edge_data, dsn_filename, dtn_filename):
+    """
+    Write the DSN and DTN Pajek files of a network together.
+    
+    Produces the same files as write_pajek_arcs_with_mode with mode "dsn" and "dtn", with
+    the same arc formatter, but the vertex section and arc endpoints are prepared once
+    and shared by both files.
+    
+    Parameters:
+      vertices: set of station codes.
+      edge_data: edge arrays as returned by build_directed_network_with_time.
+      dsn_filename: output file name for DSN weights.
+      dtn_filename: output file name for DTN weights.
+    """
+    header, src_vids, tgt_vids = _pajek_layout(vertices, edge_data)
+    src_vids, tgt_vids = src_vids.tolist(), tgt_vids.tolist()
+    arcs = {}
+    for mode, (weights, spec) in ARC_WEIGHTS.items():
+        arcs[mode] = _format_arcs(src_vids, tgt_vids, weights(edge_data).tolist(), spec)
+    
+    with open(dsn_filename, "w", buffering=1 << 20) as f_dsn, \
+         open(dtn_filename, "w", buffering=1 << 20) as f_dtn:
+        f_dsn.write(header)
+        f_dsn.write(arcs["dsn"])
+        f_dtn.write(header)
+        f_dtn.write(arcs["dtn"])
 
 # =============================================================================
 # MAIN EXECUTION
@@ -186,10 +430,12 @@ def main():
         "Space of Changes": ("changes", "DSN_SpaceChanges.net", "DTN_SpaceChanges.net")
     }
     
+    # The preparation (station ids, times, stop types, train rows) is shared by all spaces.
+    prep = _preprocess(timetable_df)
+    
     for space_name, (space_type, dsn_filename, dtn_filename) in spaces.items():
-        vertices, edge_data = build_directed_network_with_time(timetable_df, space_type)
-        write_pajek_arcs_with_mode(vertices, edge_data, dsn_filename, mode="dsn")
-        write_pajek_arcs_with_mode(vertices, edge_data, dtn_filename, mode="dtn")
+        vertices, edge_data = build_edges_for_space(prep, space_type)
+        write_pajek_arcs_both(vertices, edge_data, dsn_filename, dtn_filename)
         print(f"{space_name} DSN network saved to: {dsn_filename}")
         print(f"{space_name} DTN network saved to: {dtn_filename}")
 